@@ -0,0 +1,78 @@
+# inference_client.py
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+import httpx
+
+# Unix socket the shared inference server listens on, private to the current user
+SOCKET_PATH = os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(),
+    f"tinyllama-inference-{os.getuid()}.sock",
+)
+
+# Generation stops at the end of the assistant's turn. llama.cpp checks these while
+# streaming and holds back any partial match, so chunks never contain them.
+STOP_SEQUENCES = ["<|user|>", "</s>"]
+
+# How long to wait for a freshly started inference server to accept connections (seconds)
+SERVER_START_TIMEOUT = 30.0
+
+# Stops concurrent tool calls from each starting their own inference server
+_SERVER_START_LOCK = asyncio.Lock()
+
+# One HTTP client per process so the connection to the inference server is reused
+_client = None
+
+def _server_is_up():
+    """Check whether the inference server is accepting connections"""
+    # Never talk to a socket another user created in our place
+    if os.path.exists(SOCKET_PATH) and os.stat(SOCKET_PATH).st_uid != os.getuid():
+        raise RuntimeError(f"{SOCKET_PATH} belongs to another user, refusing to use it")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        return sock.connect_ex(SOCKET_PATH) == 0
+
+async def _ensure_server():
+    """Start inference_server.py in the background unless it is already running"""
+    async with _SERVER_START_LOCK:
+        if _server_is_up():
+            return
+        
+        script_dir = Path(__file__).parent
+        subprocess.Popen(
+            [sys.executable, str(script_dir / "inference_server.py")],
+            cwd=script_dir,
+            # Never inherit stdout, it carries the MCP protocol for stdio servers
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            # Detach so the model stays loaded for other servers after this one exits
+            start_new_session=True,
+        )
+        
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while not _server_is_up():
+            if time.monotonic() > deadline:
+                raise RuntimeError("Inference server did not start, try running 'python inference_server.py' to see why")
+            await asyncio.sleep(0.2)
+
+async def stream_completion(prompt, max_tokens=512, temperature=0.7, stop=STOP_SEQUENCES):
+    """Send a prompt to the shared inference server and yield the generated text as it arrives"""
+    global _client
+    await _ensure_server()
+    if _client is None:
+        _client = httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(uds=SOCKET_PATH), timeout=None)
+    
+    payload = {"prompt": prompt, "max_tokens": max_tokens, "temperature": temperature, "stop": stop}
+    async with _client.stream("POST", "http://inference/complete", json=payload) as response:
+        # Pass the inference server's error message on to the tool result
+        if response.is_error:
+            await response.aread()
+            raise RuntimeError(f"Inference failed: {response.text}")
+        async for text in response.aiter_text():
+            if text:
+                yield text
@@ -0,0 +1,192 @@
+# inference_server.py
+import argparse
+import asyncio
+import fcntl
+import os
+import socket
+import sys
+import threading
+import time
+import uvicorn
+from llama_cpp import Llama
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from inference_client import SOCKET_PATH, STOP_SEQUENCES
+
+# Path to the local model
+MODEL_PATH = "models/tinyllama-1.1b-chat-v1.0.Q4_K_M.gguf"
+
+# Held for the life of the server so only one instance can own the socket
+LOCK_PATH = SOCKET_PATH + ".lock"
+
+# The model is loaded once and shared by every MCP server that connects
+_MODEL = None
+_MODEL_LOCK = threading.Lock()
+
+def _get_model():
+    """Load the model on first use and return the cached instance"""
+    global _MODEL
+    if _MODEL is None:
+        with _MODEL_LOCK:
+            if _MODEL is None:
+                cpu_count = os.cpu_count() or 4
+                _MODEL = Llama(
+                    model_path=MODEL_PATH,
+                    n_ctx=2048,
+                    # Evaluate prompts in large batches on every core, generate on half of them
+                    n_batch=512,
+                    n_threads=max(1, cpu_count // 2),
+                    n_threads_batch=cpu_count,
+                    # Map the weights from the page cache instead of locking them in RAM
+                    use_mmap=True,
+                    use_mlock=False,
+                    logits_all=False,
+                    verbose=False
+                )
+    return _MODEL
+
+# Exit after this long without requests so the model does not stay resident forever
+# once every MCP server is gone (seconds)
+IDLE_TIMEOUT = 600.0
+
+# Completions queued or streaming right now, and when the last one finished
+_active_requests = 0
+_last_request_done = time.monotonic()
+
+# Completion requests waiting for the model, as (request, chunk queue, cancel flag) triples
+_inference_q = asyncio.Queue()
+_inference_worker_task = None
+
+async def _inference_worker():
+    """Run queued completions one at a time, streaming chunks back to each caller"""
+    while True:
+        request, chunks, cancelled = await _inference_q.get()
+        try:
+            # Skip requests whose caller left while they were waiting
+            if cancelled.is_set():
+                continue
+            
+            # Reuse the already loaded model (loading it on first use in a thread)
+            model = await asyncio.to_thread(_get_model)
+            stream = model.create_completion(
+                prompt=request["prompt"],
+                max_tokens=request.get("max_tokens", 512),
+                temperature=request.get("temperature", 0.7),
+                stop=request.get("stop", STOP_SEQUENCES),
+                stream=True
+            )
+            # Stop generating as soon as the caller is gone
+            while not cancelled.is_set():
+                # Generate the next chunk in a thread so the event loop stays free
+                chunk = await asyncio.to_thread(next, stream, None)
+                if chunk is None:
+                    break
+                text = chunk['choices'][0]['text']
+                if text:
+                    await chunks.put(text)
+            stream.close()
+        except Exception as e:
+            await chunks.put(e)
+        finally:
+            # None tells the caller the completion is finished
+            await chunks.put(None)
+            _inference_q.task_done()
+
+async def stream_completion(request):
+    """Queue a completion request for the inference worker and yield the generated text as it arrives"""
+    global _inference_worker_task, _active_requests, _last_request_done
+    # Start the worker on first use, once the server's event loop is running
+    if _inference_worker_task is None or _inference_worker_task.done():
+        _inference_worker_task = asyncio.create_task(_inference_worker())
+    
+    chunks = asyncio.Queue()
+    cancelled = asyncio.Event()
+    _active_requests += 1
+    await _inference_q.put((request, chunks, cancelled))
+    try:
+        while (item := await chunks.get()) is not None:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Tell the worker to stop if the caller went away before the end
+        cancelled.set()
+        _active_requests -= 1
+        _last_request_done = time.monotonic()
+
+async def complete(request):
+    """Stream the completion for a {prompt, max_tokens, temperature, stop} request as plain text"""
+    body = await request.json()
+    chunks = stream_completion(body)
+    
+    # StreamingResponse sends a 200 before the body is generated, so wait for the first
+    # chunk here; model load and prompt errors can then still be reported to the caller
+    try:
+        first = await anext(chunks, None)
+    except Exception as e:
+        return PlainTextResponse(f"{type(e).__name__}: {e}", status_code=500)
+    
+    async def body_iterator():
+        try:
+            if first is not None:
+                yield first
+            async for text in chunks:
+                yield text
+        finally:
+            # Closing the generator tells the worker to stop if the client disconnected
+            await chunks.aclose()
+    
+    return StreamingResponse(body_iterator(), media_type="text/plain; charset=utf-8")
+
+app = Starlette(routes=[Route("/complete", complete, methods=["POST"])])
+
+async def _serve_until_idle(server, idle_timeout):
+    """Run the server, shutting it down once no completion has been requested for idle_timeout seconds"""
+    async def watch_idle():
+        while True:
+            await asyncio.sleep(min(idle_timeout, 30.0))
+            if _active_requests == 0 and time.monotonic() - _last_request_done > idle_timeout:
+                # The next client to need the model starts a fresh server
+                server.should_exit = True
+                return
+    
+    watcher = asyncio.create_task(watch_idle()) if idle_timeout > 0 else None
+    try:
+        await server.serve()
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+
+# Run the server
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared TinyLlama inference server")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT,
+                        help="exit after this many seconds without requests, 0 to run until stopped")
+    args = parser.parse_args()
+    
+    # Binding would silently replace the socket of a server that is already running,
+    # leaving a second copy of the model resident, so exit if another instance holds the lock
+    lock_fd = os.open(LOCK_PATH, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        print("Inference server is already running", file=sys.stderr)
+        sys.exit(0)
+    
+    # Holding the lock means any existing socket was left behind by a server that exited
+    if os.path.lexists(SOCKET_PATH):
+        os.unlink(SOCKET_PATH)
+    
+    # Bind the socket ourselves so only the current user can connect; uvicorn would
+    # make a socket it creates world-writable
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        sock.bind(SOCKET_PATH)
+    finally:
+        os.umask(old_umask)
+    os.chmod(SOCKET_PATH, 0o600)
+    
+    server = uvicorn.Server(uvicorn.Config(app, fd=sock.fileno()))
+    asyncio.run(_serve_until_idle(server, args.idle_timeout))
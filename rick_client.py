@@ -1,19 +1,46 @@
 # rick_client.py
+import argparse
 import asyncio
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
 from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
 from mcp.client.stdio import stdio_client
 
-async def main():
-    # Create server parameters for stdio connection
+async def read_resource_text(session, uri):
+    """Read a resource from the server; it may be shared with other clients, so nothing is cached"""
+    resource_result = await session.read_resource(uri)
+    # Extract the text content from the first content item
+    return resource_result.contents[0].text
+
+async def print_stream(params):
+    """Print streamed response text as the server sends it"""
+    print(params.data, end="", flush=True)
+
+@asynccontextmanager
+async def connect(url):
+    """Connect to the SSE server at url, or start a private rick_server.py over stdio"""
+    if url:
+        async with sse_client(url) as streams:
+            yield streams
+        return
+    
+    # Launch the server by absolute path; it finds its KB relative to its own directory
+    script_dir = Path(__file__).parent
     server_params = StdioServerParameters(
-        command="python",
-        args=["rick_server.py"],
+        command=sys.executable,
+        args=[str(script_dir / "rick_server.py")],
+        cwd=script_dir,
     )
-    
+    async with stdio_client(server_params) as streams:
+        yield streams
+
+async def main(url):
     # Connect to the server
     print("Connecting to Rick's Knowledge Base server...")
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
+    async with connect(url) as (read, write):
+        async with ClientSession(read, write, logging_callback=print_stream) as session:
             # Initialize the connection
             await session.initialize()
             
@@ -37,43 +64,44 @@ async def main():
                 print("5. Create a new section")
                 print("6. Exit")
                 
-                choice = input("\nEnter your choice (1-6): ")
+                # Read input in a thread so the event loop keeps running
+                choice = await asyncio.to_thread(input, "\nEnter your choice (1-6): ")
                 
                 if choice == '1':
                     # Read the entire knowledge base
                     print("\nReading full knowledge base...")
-                    resource_result = await session.read_resource("rickskb://main")
-                    # Extract the text content from the first content item
-                    kb_content = resource_result.contents[0].text
+                    kb_content = await read_resource_text(session, "rickskb://main")
                     print("\n" + kb_content)
                     
                 elif choice == '2':
                     # Read a specific section
-                    section = input("Enter section number: ")
+                    section = await asyncio.to_thread(input, "Enter section number: ")
                     print(f"\nReading section {section}...")
-                    resource_result = await session.read_resource(f"rickskb://section/{section}")
-                    # Extract the text content from the first content item
-                    section_content = resource_result.contents[0].text
+                    section_content = await read_resource_text(session, f"rickskb://section/{section}")
                     print("\n" + section_content)
                     
                 elif choice == '3':
                     # Query the knowledge base
-                    query = input("Enter your query for Rick's knowledge base: ")
+                    query = await asyncio.to_thread(input, "Enter your query for Rick's knowledge base: ")
                     print("\nProcessing query with LLM...")
+                    # The answer is printed as it streams in
+                    print("\nRick's AI says: ", end="", flush=True)
                     result = await session.call_tool("query_kb", {"query": query})
-                    print("\nRick's AI says:", result.content[0].text)
+                    if result.isError:
+                        print(result.content[0].text, end="")
+                    print()
                     
                 elif choice == '4':
                     # Add entry to a section
-                    section = input("Enter section number: ")
-                    entry = input("Enter new entry: ")
+                    section = await asyncio.to_thread(input, "Enter section number: ")
+                    entry = await asyncio.to_thread(input, "Enter new entry: ")
                     print("\nAdding entry...")
                     result = await session.call_tool("add_to_kb", {"section": int(section), "entry": entry})
                     print("\nResult:", result.content[0].text)
                     
                 elif choice == '5':
                     # Create a new section
-                    title = input("Enter new section title: ")
+                    title = await asyncio.to_thread(input, "Enter new section title: ")
                     print("\nCreating section...")
                     result = await session.call_tool("create_section", {"title": title})
                     print("\nResult:", result.content[0].text)
@@ -85,7 +113,10 @@ async def main():
                 else:
                     print("Invalid choice, please try again")
                 
-                input("\nPress Enter to continue...")
+                await asyncio.to_thread(input, "\nPress Enter to continue...")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Client for Rick's Knowledge Base server")
+    parser.add_argument("--url", help="SSE endpoint of a server started with 'rick_server.py --sse', e.g. http://127.0.0.1:8000/sse")
+    args = parser.parse_args()
+    asyncio.run(main(args.url))
\ No newline at end of file
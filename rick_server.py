@@ -1,72 +1,150 @@
 # rick_server.py
+import argparse
+import asyncio
+import mmap
 import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
 from mcp.server.fastmcp import FastMCP, Context
+from inference_client import stream_completion
+from rank_bm25 import BM25Okapi
 
-# Create the server
-mcp = FastMCP("RickKnowledgeBase")
+# Create the server, listening only on localhost when served over SSE
+mcp = FastMCP("RickKnowledgeBase", host="127.0.0.1", port=8000)
 
 # Path to Rick's knowledge base
 KB_PATH = "Ricks_KB.txt"
 
+# Matches a numbered section header such as "3. FAMILY DYSFUNCTION DATABASE"
+_SECTION_HEADER_RE = re.compile(rb'(?m)^(\d+)\.\s')
+
+# Cached (file signature, {section_number: (start, end)}, read-only mmap of the KB file)
+_KB_INDEX_CACHE = None
+
+# How many of the most relevant sections are included in an LLM prompt
+TOP_K_SECTIONS = 3
+
+# Cached (kb mapping, BM25 index, section texts), rebuilt whenever the section index is
+_BM25_CACHE = None
+
+# Serializes read-modify-write updates now that file I/O runs in worker threads
+_KB_WRITE_LOCK = asyncio.Lock()
+
 # Helper functions
-def read_kb():
-    """Read the knowledge base file"""
+async def read_kb():
+    """Read the knowledge base file without blocking the event loop"""
     if not os.path.exists(KB_PATH):
         return "Knowledge base not found"
-    with open(KB_PATH, 'r') as f:
-        return f.read()
-
-def write_kb(content):
-    """Write to the knowledge base file"""
-    with open(KB_PATH, 'w') as f:
-        f.write(content)
-    return "Knowledge base updated successfully"
-
-# Resource to access the knowledge base
-@mcp.resource("rickskb://main")
-def get_kb() -> str:
+    return await asyncio.to_thread(Path(KB_PATH).read_text)
+
+def _replace_kb(data):
+    """Atomically replace the knowledge base file with the given bytes"""
+    global _KB_INDEX_CACHE
+    kb_dir = os.path.dirname(os.path.abspath(KB_PATH))
+    # Write a sibling temp file and rename it over the KB, so a crash never leaves a partial file
+    f = tempfile.NamedTemporaryFile(dir=kb_dir, delete=False)
+    try:
+        with f:
+            f.write(data)
+            # Make sure the new contents are on disk before they replace the old ones
+            f.flush()
+            os.fsync(f.fileno())
+        # Keep the original file permissions rather than the temp file's 0600
+        if os.path.exists(KB_PATH):
+            shutil.copymode(KB_PATH, f.name)
+        os.replace(f.name, KB_PATH)
+    except BaseException:
+        os.unlink(f.name)
+        raise
+    _KB_INDEX_CACHE = None
+
+def _append_kb(data):
+    """Append bytes to the end of the knowledge base file"""
+    global _KB_INDEX_CACHE
+    with open(KB_PATH, 'ab') as f:
+        f.write(data)
+    _KB_INDEX_CACHE = None
+
+def _file_signature(st):
+    """Identify a version of the KB file; mtime alone can repeat within one timestamp tick"""
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+def _get_index():
+    """Return the section index and a read-only mapping of the KB, rebuilding them if the file changed"""
+    global _KB_INDEX_CACHE
+    if _KB_INDEX_CACHE is not None and _KB_INDEX_CACHE[0] == _file_signature(os.stat(KB_PATH)):
+        return _KB_INDEX_CACHE[1], _KB_INDEX_CACHE[2]
+    
+    # Map the file instead of reading it so sections are sliced straight from the page cache
+    with open(KB_PATH, 'rb') as f:
+        st = os.fstat(f.fileno())
+        # An empty file cannot be mapped
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else b''
+    
+    # Walk the file once, recording where each section header starts
+    starts = [(int(m.group(1)), m.start()) for m in _SECTION_HEADER_RE.finditer(data)]
+    
+    # Each section runs until the first blank line or the next header, whichever comes first
+    index = {}
+    for i, (number, start) in enumerate(starts):
+        limit = starts[i + 1][1] if i + 1 < len(starts) else len(data)
+        end = data.find(b'\n\n', start, limit)
+        index[number] = (start, end if end != -1 else limit)
+    
+    _KB_INDEX_CACHE = (_file_signature(st), index, data)
+    return index, data
+
+def _tokenize(text):
+    """Split text into lowercase word tokens for BM25"""
+    return re.findall(r'\w+', text.lower())
+
+def _retrieve_sections(query):
+    """Return the KB sections most relevant to the query, best match first"""
+    global _BM25_CACHE
+    index, data = _get_index()
+    if _BM25_CACHE is None or _BM25_CACHE[0] is not data:
+        sections = [data[start:end].decode().rstrip() for start, end in index.values()]
+        bm25 = BM25Okapi([_tokenize(section) for section in sections]) if sections else None
+        _BM25_CACHE = (data, bm25, sections)
+    
+    _, bm25, sections = _BM25_CACHE
+    if bm25 is None:
+        return []
+    return bm25.get_top_n(_tokenize(query), sections, n=TOP_K_SECTIONS)
+
+# Resources to access the knowledge base
+async def get_kb() -> str:
     """Get Rick's entire knowledge base"""
-    return read_kb()
+    return await read_kb()
 
-@mcp.resource("rickskb://section/{section_number}")
-def get_kb_section(section_number: str) -> str:
+async def get_kb_section(section_number: str) -> str:
     """Get a specific section from Rick's knowledge base"""
-    kb_content = read_kb()
-    
-    # Find the section
     try:
         section_num = int(section_number)
-        section_header = f"{section_num}. "
-        
-        # Split by sections and find the requested one
-        sections = kb_content.split("\n\n")
-        for i, section in enumerate(sections):
-            if section.strip().startswith(section_header):
-                # Return this section and its content until the next section
-                if i < len(sections) - 1:
-                    return section
-                else:
-                    return section
-                    
-        return f"Section {section_number} not found"
     except ValueError:
         return f"Invalid section number: {section_number}"
+    
+    if not os.path.exists(KB_PATH):
+        return "Knowledge base not found"
+    
+    # Look the section up in the precomputed index
+    index, data = await asyncio.to_thread(_get_index)
+    if section_num not in index:
+        return f"Section {section_number} not found"
+    
+    start, end = index[section_num]
+    return data[start:end].decode().rstrip()
 
 # Tools to interact with the knowledge base
-@mcp.tool()
-def query_kb(query: str) -> str:
+async def query_kb(query: str, ctx: Context) -> str:
     """Query Rick's knowledge base using the local LLM"""
-    from llama_cpp import Llama
-    
-    kb_content = read_kb()
-    
-    # Load the model
-    model_path = "models/tinyllama-1.1b-chat-v1.0.Q4_K_M.gguf"
-    model = Llama(
-        model_path=model_path,
-        n_ctx=2048,
-        n_threads=4
-    )
+    # Only the most relevant sections go into the prompt so it fits the context window
+    if not os.path.exists(KB_PATH):
+        kb_content = "Knowledge base not found"
+    else:
+        kb_content = "\n\n".join(await asyncio.to_thread(_retrieve_sections, query))
     
     # Format the prompt for TinyLlama
     formatted_prompt = f"""<|system|>
@@ -79,69 +157,73 @@ Knowledge base:
 <|assistant|>
 """
     
-    # Generate completion
-    output = model.create_completion(
-        prompt=formatted_prompt,
-        max_tokens=512,
-        temperature=0.7,
-        stop=["<|user|>", "</s>"]
-    )
+    # Stream the completion, forwarding each piece to the client as it arrives
+    parts = []
+    async for text in stream_completion(formatted_prompt):
+        parts.append(text)
+        await ctx.info(text)
     
-    # Return the generated text
-    return output['choices'][0]['text']
+    # Return the full generated text
+    return "".join(parts)
 
-@mcp.tool()
-def add_to_kb(section: int, entry: str) -> str:
+async def add_to_kb(section: int, entry: str) -> str:
     """Add a new entry to a section in Rick's knowledge base"""
-    kb_content = read_kb()
-    lines = kb_content.split('\n')
-    
-    # Find the section
-    section_header = f"{section}. "
-    section_found = False
-    section_end = None
-    
-    for i, line in enumerate(lines):
-        if line.strip().startswith(section_header):
-            section_found = True
-            
-        # Check if we've found the section and are now at the next section or the end
-        elif section_found and (line.strip().startswith(f"{section+1}. ") or i == len(lines)-1):
-            section_end = i
-            break
-    
-    if not section_found:
-        return f"Section {section} not found"
-    
-    if section_end:
-        # Insert the new entry before the next section
-        lines.insert(section_end, f"- {entry}")
-    else:
-        # Add to the end of the file
-        lines.append(f"- {entry}")
+    if not os.path.exists(KB_PATH):
+        return "Knowledge base not found"
     
-    # Write back to the file
-    write_kb('\n'.join(lines))
+    async with _KB_WRITE_LOCK:
+        # Find the section
+        index, data = await asyncio.to_thread(_get_index)
+        if section not in index:
+            return f"Section {section} not found"
+        
+        # Insert the new entry after the last line of the section, keeping the
+        # newlines that separated it from whatever follows
+        _, end = index[section]
+        head = data[:end].rstrip(b'\n')
+        new_data = head + b'\n- ' + entry.encode() + data[len(head):]
+        
+        # Write back to the file
+        await asyncio.to_thread(_replace_kb, new_data)
     return f"Added entry to section {section}: {entry}"
 
-@mcp.tool()
-def create_section(title: str) -> str:
+async def create_section(title: str) -> str:
     """Create a new section in Rick's knowledge base"""
-    kb_content = read_kb()
-    
-    # Count existing sections to determine the new section number
-    section_count = 0
-    for line in kb_content.split('\n'):
-        if line.strip() and line[0].isdigit() and '. ' in line:
-            section_count += 1
-    
-    # Create new section
-    new_section = f"\n\n{section_count + 1}. {title.upper()}"
+    if not os.path.exists(KB_PATH):
+        return "Knowledge base not found"
     
-    # Append to knowledge base
-    write_kb(kb_content + new_section)
+    async with _KB_WRITE_LOCK:
+        # The highest existing section number comes straight from the section index
+        index, _ = await asyncio.to_thread(_get_index)
+        section_count = max(index, default=0)
+        
+        # Create new section
+        new_section = f"\n\n{section_count + 1}. {title.upper()}"
+        
+        # Append only the new bytes instead of rewriting the whole file
+        await asyncio.to_thread(_append_kb, new_section.encode())
     return f"Created new section: {section_count + 1}. {title.upper()}"
 
+# Register everything the server exposes in one place
+RESOURCES = [
+    ("rickskb://main", get_kb),
+    ("rickskb://section/{section_number}", get_kb_section),
+]
+TOOLS = [query_kb, add_to_kb, create_section]
+
+for uri, fn in RESOURCES:
+    mcp.resource(uri)(fn)
+for fn in TOOLS:
+    mcp.tool()(fn)
+
 # Run the server
 if __name__ == "__main__":
-    mcp.run()
\ No newline at end of file
+    # stdio is the default; it is only reachable by the process that started the server.
+    # SSE has no authentication, so any local user can call the tools that rewrite the KB.
+    parser = argparse.ArgumentParser(description="Rick's Knowledge Base MCP server")
+    parser.add_argument("--sse", action="store_true", help="serve over SSE so several clients can share this server (unauthenticated)")
+    parser.add_argument("--port", type=int, default=mcp.settings.port, help="port to listen on for SSE")
+    args = parser.parse_args()
+    
+    mcp.settings.port = args.port
+    mcp.run(transport="sse" if args.sse else "stdio")
\ No newline at end of file
@@ -3,6 +3,10 @@ import asyncio
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
+async def print_stream(params):
+    """Print streamed response text as the server sends it"""
+    print(params.data, end="", flush=True)
+
 async def main():
     # Create server parameters for stdio connection
     server_params = StdioServerParameters(
@@ -12,7 +16,7 @@ async def main():
     
     # Connect to the server
     async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
+        async with ClientSession(read, write, logging_callback=print_stream) as session:
             # Initialize the connection
             await session.initialize()
             
@@ -22,19 +26,20 @@ async def main():
             
             # Simple interaction loop
             while True:
-                # Get user input
-                user_input = input("\nEnter a prompt (or 'exit' to quit): ")
+                # Get user input in a thread so the event loop keeps running
+                user_input = await asyncio.to_thread(input, "\nEnter a prompt (or 'exit' to quit): ")
                 
                 if user_input.lower() == 'exit':
                     break
                 
                 print("Calling LLM through MCP...")
                 
-                # Call the tool with the user's input
+                # Call the tool with the user's input, the response is printed as it streams in
+                print("\nResponse: ", end="", flush=True)
                 result = await session.call_tool("query_llm", {"prompt": user_input})
-                
-                # Print the result
-                print("\nResponse:", result.content[0].text)
+                if result.isError:
+                    print(result.content[0].text, end="")
+                print()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
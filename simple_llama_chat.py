@@ -1,3 +1,4 @@
+import os
 import sys
 from llama_cpp import Llama
 
@@ -6,30 +7,77 @@ model_path = "models/tinyllama-1.1b-chat-v1.0.Q4_K_M.gguf"
 print(f"Loading model from {model_path}...")
 
 # Initialize the model with basic parameters
+cpu_count = os.cpu_count() or 4
 model = Llama(
     model_path=model_path,
-    n_ctx=2048,      # Context window size
-    n_threads=4      # Number of CPU threads to use
+    n_ctx=2048,                          # Context window size
+    n_batch=512,                         # Prompt tokens evaluated per batch
+    n_threads=max(1, cpu_count // 2),    # CPU threads used while generating
+    n_threads_batch=cpu_count,           # CPU threads used for prompt evaluation
+    use_mmap=True,                       # Map the weights instead of reading them into RAM
+    use_mlock=False,
+    logits_all=False,
+    verbose=False
 )
 print("Model loaded successfully")
 
+# TinyLlama's chat format for each message role
+_TEMPLATES = {
+    "system": "<|system|>\n{content}</s>\n",
+    "user": "<|user|>\n{content}</s>\n",
+    "assistant": "<|assistant|>\n{content}</s>\n",
+}
+
+# Maximum number of tokens generated per reply
+MAX_TOKENS = 512
+
+# Format a single message, or return "" for an unknown role
+def format_message(message):
+    template = _TEMPLATES.get(message.get("role", ""))
+    return template.format(content=message.get("content", "")) if template else ""
+
 # Simple prompt formatter for TinyLlama's chat format
 def format_prompt(messages):
-    prompt = ""
-    for message in messages:
-        role = message.get("role", "")
-        content = message.get("content", "")
-        
-        if role == "system":
-            prompt += f"<|system|>\n{content}</s>\n"
-        elif role == "user":
-            prompt += f"<|user|>\n{content}</s>\n"
-        elif role == "assistant":
-            prompt += f"<|assistant|>\n{content}</s>\n"
+    # Collect the pieces and join once instead of growing a string with +=
+    parts = [format_message(message) for message in messages]
     
     # Add final assistant prefix for the model to continue
-    prompt += "<|assistant|>\n"
-    return prompt
+    parts.append("<|assistant|>\n")
+    return "".join(parts)
+
+# Count the tokens a message adds to the prompt, tokenizing each message only once
+def message_tokens(message):
+    if "n_tokens" not in message:
+        text = format_message(message).encode()
+        message["n_tokens"] = len(model.tokenize(text, add_bos=False, special=True))
+    return message["n_tokens"]
+
+# Tokens available for the prompt: the context window minus the BOS token, the
+# final assistant prefix and room for a full reply
+PROMPT_BUDGET = (model.n_ctx() - MAX_TOKENS - 1
+                 - len(model.tokenize(b"<|assistant|>\n", add_bos=False, special=True)))
+
+# Once the history overflows, it is trimmed down to this many tokens rather than just
+# under the budget, so the trimmed prompt stays a stable prefix for the next few turns
+TRIM_TARGET = PROMPT_BUDGET // 2
+
+# Keep the prompt plus a full reply inside the context window. llama.cpp reuses the
+# KV cache for the part of the prompt that matches the previous one, so while the
+# history only grows, just the new turns are evaluated. A trim changes everything
+# after the system message and the whole kept history is evaluated again; trimming
+# to TRIM_TARGET makes that happen once every few turns instead of on every turn.
+def trim_history(messages):
+    used = sum(message_tokens(message) for message in messages)
+    if used <= PROMPT_BUDGET:
+        return messages
+    
+    # Drop whole user/assistant turns, oldest first, so the kept history never starts
+    # with a reply to a question that is gone. The newest message is always kept; the
+    # caller checks that it fits.
+    system, history = messages[:1], messages[1:]
+    while len(history) > 1 and (used > TRIM_TARGET or history[0]["role"] != "user"):
+        used -= message_tokens(history.pop(0))
+    return system + history
 
 # Start with a system message
 messages = [
@@ -47,8 +95,15 @@ while True:
         print("Goodbye!")
         break
     
-    # Add user message to history
-    messages.append({"role": "user", "content": user_input})
+    # Refuse a message that cannot fit in the context window even on its own
+    user_message = {"role": "user", "content": user_input}
+    if message_tokens(messages[0]) + message_tokens(user_message) > PROMPT_BUDGET:
+        print(f"\nThat message is too long ({message_tokens(user_message)} tokens), please shorten it.")
+        continue
+    
+    # Add user message to history, forgetting the oldest turns if it no longer fits
+    messages.append(user_message)
+    messages = trim_history(messages)
     
     # Format prompt and generate response
     prompt = format_prompt(messages)
@@ -58,7 +113,7 @@ while True:
     # Generate completion
     output = model.create_completion(
         prompt=prompt,
-        max_tokens=512,
+        max_tokens=MAX_TOKENS,
         temperature=0.7,
         stop=["<|user|>", "</s>"]
     )